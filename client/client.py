@@ -1,13 +1,25 @@
-import json
 import socket
 import subprocess
 import threading
 import time
-import uuid
 import random
 import string
 import tomllib
 
+import orjson
+
+# Minimum playback jump (s) or wall-clock gap (s) before forwarding time-pos
+TIME_SEND_MIN_DELTA = 0.25
+TIME_SEND_MIN_INTERVAL = 0.5
+
+# Pre-encoded MPV IPC commands for the fixed command vocabulary
+MPV_OBSERVE_PAUSE = b'{"command":["observe_property",1,"pause"]}\n'
+MPV_OBSERVE_TIME = b'{"command":["observe_property",2,"time-pos"]}\n'
+MPV_SET_PAUSE = {
+    True: b'{"command":["set_property","pause",true]}\n',
+    False: b'{"command":["set_property","pause",false]}\n',
+}
+
 
 class MPVPlayer:
     """Class to manage an MPV subprocess with IPC enabled."""
@@ -65,14 +77,21 @@ class SyncClient:
             server_port (int): Sync server port.
             debug (bool): Enable debug logging.
         """
-        self.client_id = str(uuid.uuid4())
+        self.client_id = random.getrandbits(63)
         self.mpv_socket_path = mpv_socket_path
         self.server_host = server_host
         self.server_port = server_port
         self.debug = debug
 
         self.mpv_sock = None
+        self.mpv_rfile = None
         self.server_sock = None
+        self.server_rfile = None
+        self._mpv_write_lock = threading.Lock()
+        self._srv_write_lock = threading.Lock()
+
+        self._last_sent_time = 0.0
+        self._last_sent_wall = 0.0
 
     def _log(self, msg: str):
         """Print debug messages if debug is enabled."""
@@ -84,6 +103,7 @@ class SyncClient:
         # Connect to MPV IPC
         self.mpv_sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
         deadline = time.time() + 5
+        attempt = 0
         while True:
             try:
                 self.mpv_sock.connect(self.mpv_socket_path)
@@ -93,12 +113,16 @@ class SyncClient:
                     raise TimeoutError(
                         f"Could not connect to mpv IPC socket: {self.mpv_socket_path}"
                     )
-                time.sleep(0.1)
+                # Back off from 10 ms so a fast mpv start is picked up quickly
+                time.sleep(min(0.2, 0.01 * (1.5**attempt)))
+                attempt += 1
+        self.mpv_rfile = self.mpv_sock.makefile("rb", buffering=65536)
         self._log(f"[CONNECTED] MPV at {self.mpv_socket_path}")
 
         # Connect to sync server
         self.server_sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self.server_sock.connect((self.server_host, self.server_port))
+        self.server_rfile = self.server_sock.makefile("rb", buffering=65536)
         self._log(f"[CONNECTED] Server at {self.server_host}:{self.server_port}")
 
     def run(self):
@@ -112,77 +136,81 @@ class SyncClient:
         except KeyboardInterrupt:
             self._log("[EXIT] Shutting down")
 
-    def _send_to_mpv(self, command: list):
-        """Send a command to the MPV IPC socket."""
-        msg = {"command": command}
-        self.mpv_sock.sendall((json.dumps(msg) + "\n").encode("utf-8"))
+    def _send_to_mpv(self, payload: bytes):
+        """Send an encoded, newline-terminated command to the MPV IPC socket."""
+        with self._mpv_write_lock:
+            self.mpv_sock.sendall(payload)
 
     def _send_to_server(self, event: dict):
         """Send an event to the sync server."""
         event["source"] = self.client_id
-        self.server_sock.sendall((json.dumps(event) + "\n").encode("utf-8"))
+        self._send_raw_to_server(orjson.dumps(event) + b"\n")
+
+    def _send_raw_to_server(self, payload: bytes):
+        """Send an encoded, newline-terminated event to the sync server."""
+        with self._srv_write_lock:
+            self.server_sock.sendall(payload)
 
     def _observe_mpv(self):
         """Observe MPV properties (pause, time-pos) and send updates to server."""
-        self._send_to_mpv(["observe_property", 1, "pause"])
-        self._send_to_mpv(["observe_property", 2, "time-pos"])
-
-        buffer = ""
-        while True:
-            data = self.mpv_sock.recv(4096)
-            if not data:
-                break
-            buffer += data.decode("utf-8")
-
-            while "\n" in buffer:
-                line, buffer = buffer.split("\n", 1)
-                if not line.strip():
-                    continue
-
-                msg = json.loads(line)
-                if msg.get("event") == "property-change":
-                    name = msg.get("name")
-                    value = msg.get("data")
-
-                    if name == "pause":
-                        self._log(f"[MPV] Pause: {value}")
-                        self._send_to_server({"event": "pause", "paused": value})
-
-                    elif name == "time-pos":
-                        if value is not None:
-                            self._log(f"[MPV] Time: {value:.2f}")
-                            self._send_to_server({"event": "time", "raw_time": value})
-                        else:
-                            self._log("[MPV] Time: None (no playback yet)")
-
-                elif msg.get("event") == "seek":
-                    self._log("[MPV] Seek detected")
+        self._send_to_mpv(MPV_OBSERVE_PAUSE)
+        self._send_to_mpv(MPV_OBSERVE_TIME)
+
+        for line in self.mpv_rfile:
+            if line.isspace():
+                continue
+
+            msg = orjson.loads(line)
+            if msg.get("event") == "property-change":
+                name = msg.get("name")
+                value = msg.get("data")
+
+                if name == "pause":
+                    self._log(f"[MPV] Pause: {value}")
+                    self._send_to_server({"event": "pause", "paused": value})
+
+                elif name == "time-pos":
+                    if value is not None:
+                        now = time.monotonic()
+                        if (
+                            abs(value - self._last_sent_time) < TIME_SEND_MIN_DELTA
+                            and now - self._last_sent_wall < TIME_SEND_MIN_INTERVAL
+                        ):
+                            continue
+                        self._last_sent_time = value
+                        self._last_sent_wall = now
+                        self._log(f"[MPV] Time: {value:.2f}")
+                        self._send_raw_to_server(
+                            f'{{"event":"time","raw_time":{value},'
+                            f'"source":{self.client_id}}}\n'.encode()
+                        )
+                    else:
+                        self._log("[MPV] Time: None (no playback yet)")
+
+            elif msg.get("event") == "seek":
+                self._log("[MPV] Seek detected")
 
     def _listen_server(self):
         """Listen for events from the sync server and apply them to MPV."""
-        buffer = ""
-        while True:
-            data = self.server_sock.recv(4096)
-            if not data:
-                break
-            buffer += data.decode("utf-8")
-
-            while "\n" in buffer:
-                line, buffer = buffer.split("\n", 1)
-                if not line.strip():
-                    continue
-
-                msg = json.loads(line)
-                if msg.get("source") == self.client_id:
-                    continue
-
-                event = msg.get("event")
-                if event == "pause":
-                    self._log(f"[SYNC] Apply pause={msg['paused']}")
-                    self._send_to_mpv(["set_property", "pause", msg["paused"]])
-                elif event in ("seek", "time"):
-                    self._log(f"[SYNC] Apply time={msg['raw_time']:.2f}")
-                    self._send_to_mpv(["set_property", "time-pos", msg["raw_time"]])
+        for line in self.server_rfile:
+            if line.isspace():
+                continue
+
+            msg = orjson.loads(line)
+            if msg.get("source") == self.client_id:
+                continue
+
+            event = msg.get("event")
+            if event == "pause":
+                self._log(f"[SYNC] Apply pause={msg['paused']}")
+                self._send_to_mpv(MPV_SET_PAUSE[bool(msg["paused"])])
+            elif event in ("seek", "time"):
+                # Coerce before formatting so only a number reaches the mpv command
+                raw_time = float(msg["raw_time"])
+                self._log(f"[SYNC] Apply time={raw_time:.2f}")
+                self._send_to_mpv(
+                    f'{{"command":["set_property","time-pos",{raw_time}]}}\n'.encode()
+                )
 
 
 def main():
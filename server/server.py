@@ -1,14 +1,25 @@
-from flask import Flask, request, send_file, Response
+from flask import Flask, send_file, Response
+import asyncio
 import os
-import socket
+import re
+import signal
 import threading
-import json
 import functools
 import tomllib
 from typing import Any, Dict
 import tkinter as tk
 from tkinter import filedialog
 
+import orjson
+from waitress import serve
+
+# Window (s) over which broadcasts are coalesced into one write per client
+BROADCAST_FLUSH_INTERVAL = 0.02
+
+# Match the compact JSON the client writes; other formatting falls back to orjson.loads
+TIME_EVENT_MARKER = b'"event":"time"'
+RAW_TIME_RE = re.compile(rb'"raw_time":([-+\d.eE]+)')
+
 
 class SyncServer:
     """Server to synchronize playback among multiple clients."""
@@ -16,8 +27,10 @@ class SyncServer:
     def __init__(self, time_tolerance: float, debug: bool = False):
         self.time_tolerance = time_tolerance
         self.debug = debug
-        self.clients: set[socket.socket] = set()
-        self.lock = threading.Lock()
+        # Only touched from the event loop thread, so no lock is needed
+        self.clients: set[asyncio.StreamWriter] = set()
+        self.outbox: dict[asyncio.StreamWriter, list[bytes]] = {}
+        self._flush_task: asyncio.Task | None = None
         self.current_pause = False
         self.current_time = 0.0
 
@@ -27,74 +40,104 @@ class SyncServer:
             print(msg)
 
     def _handle_errors(self, func):
-        """Decorator to catch and log exceptions in threaded functions."""
+        """Decorator to catch and log exceptions in client handler coroutines."""
 
         @functools.wraps(func)
-        def wrapper(*args, **kwargs):
+        async def wrapper(*args, **kwargs):
             try:
-                return func(*args, **kwargs)
+                return await func(*args, **kwargs)
             except Exception as e:
                 print(f"[ERROR] Exception in {func.__name__}: {e}")
 
         return wrapper
 
-    def broadcast_to_others(self, message: Dict[str, Any], sender_conn: socket.socket):
-        """Broadcast a message to all connected clients except the sender."""
-        raw = (json.dumps(message) + "\n").encode("utf-8")
-        with self.lock:
-            for client in self.clients.copy():
-                if client != sender_conn:
-                    try:
-                        client.sendall(raw)
-                    except Exception as e:
-                        self._log(f"[ERROR] Failed to send to client: {e}")
+    def broadcast_to_others(
+        self, message: Dict[str, Any], sender: asyncio.StreamWriter
+    ):
+        """Queue a message for all connected clients except the sender."""
+        raw = orjson.dumps(message) + b"\n"
+        for writer in self.clients:
+            if writer is not sender:
+                self.outbox.setdefault(writer, []).append(raw)
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_outbox())
+
+    async def _flush_outbox(self):
+        """Send everything queued during the flush window, one batch per client."""
+        await asyncio.sleep(BROADCAST_FLUSH_INTERVAL)
+        outbox, self.outbox = self.outbox, {}
+        self._flush_task = None
+        await asyncio.gather(*(self._send(w, chunks) for w, chunks in outbox.items()))
+
+    async def _send(self, writer: asyncio.StreamWriter, chunks: list[bytes]):
+        """Write queued chunks to one client, dropping it if the write fails."""
+        if writer not in self.clients:
+            return
+        try:
+            writer.writelines(chunks)
+            await writer.drain()
+        except Exception as e:
+            self._log(f"[ERROR] Failed to send to client: {e}")
+            self.clients.discard(writer)
+            # Ends the handler's read loop so the normal disconnect path runs
+            writer.close()
 
     def start(self, host: str, port: int):
         """Start the sync server and accept client connections."""
+        asyncio.run(self._serve(host, port))
+
+    async def _serve(self, host: str, port: int):
+        """Run the asyncio server until the event loop is stopped."""
+        server = await asyncio.start_server(
+            self._handle_errors(self.handle_client), host, port, limit=65536
+        )
         print(f"[SYNC SERVER] Listening on {host}:{port}")
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as server:
-            server.bind((host, port))
-            server.listen()
-            while True:
-                conn, addr = server.accept()
-                threading.Thread(
-                    target=self._handle_errors(self.handle_client),
-                    args=(conn, addr),
-                    daemon=True,
-                ).start()
-
-    def handle_client(self, conn: socket.socket, addr: Any):
+        async with server:
+            await server.serve_forever()
+
+    async def handle_client(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ):
         """Handle messages from a single client."""
+        addr = writer.get_extra_info("peername")
         print(f"[CONNECT] {addr} connected")
-        with self.lock:
-            self.clients.add(conn)
+        self.clients.add(writer)
 
-        buffer = ""
         try:
-            while True:
-                data = conn.recv(4096)
-                if not data:
-                    break
-                buffer += data.decode("utf-8")
-                while "\n" in buffer:
-                    line, buffer = buffer.split("\n", 1)
-                    if not line.strip():
-                        continue
-
-                    try:
-                        msg = json.loads(line)
-                    except json.JSONDecodeError:
-                        self._log(f"[WARN] Invalid JSON: {line}")
-                        continue
-
-                    self._handle_message(msg, conn)
+            async for line in reader:
+                if line.isspace() or self._is_redundant_time(line):
+                    continue
+
+                try:
+                    msg = orjson.loads(line)
+                except orjson.JSONDecodeError:
+                    self._log(f"[WARN] Invalid JSON: {line}")
+                    continue
+
+                self._handle_message(msg, writer)
         finally:
             print(f"[DISCONNECT] {addr}")
-            with self.lock:
-                self.clients.discard(conn)
-            conn.close()
-
-    def _handle_message(self, msg: Dict[str, Any], sender_conn: socket.socket):
+            self.clients.discard(writer)
+            self.outbox.pop(writer, None)
+            writer.close()
+
+    def _is_redundant_time(self, line: bytes) -> bool:
+        """Check a raw time event against the tolerance without parsing JSON."""
+        if TIME_EVENT_MARKER not in line:
+            return False
+        match = RAW_TIME_RE.search(line)
+        if match is None:
+            return False
+        try:
+            drift = abs(float(match.group(1)) - self.current_time)
+        except ValueError:
+            return False
+        if drift > self.time_tolerance:
+            return False
+        self._log(f"[SKIP] Drift {drift:.2f}s within tolerance")
+        return True
+
+    def _handle_message(self, msg: Dict[str, Any], sender: asyncio.StreamWriter):
         """Process a message from a client and broadcast updates if necessary."""
         event = msg.get("event")
         if event == "pause":
@@ -102,7 +145,7 @@ class SyncServer:
             if new_pause != self.current_pause:
                 self.current_pause = new_pause
                 self._log(f"[UPDATE] Pause: {new_pause}")
-                self.broadcast_to_others(msg, sender_conn)
+                self.broadcast_to_others(msg, sender)
 
         elif event in ("seek", "time"):
             new_time = msg.get("raw_time")
@@ -112,7 +155,7 @@ class SyncServer:
             if drift > self.time_tolerance:
                 self.current_time = new_time
                 self._log(f"[UPDATE] Time change: {new_time:.2f}s (drift={drift:.2f}s)")
-                self.broadcast_to_others(msg, sender_conn)
+                self.broadcast_to_others(msg, sender)
             else:
                 self._log(f"[SKIP] Drift {drift:.2f}s within tolerance")
 
@@ -130,42 +173,20 @@ class MkvServer:
     def serve_video(self):
         """Serve the MKV file, supporting HTTP range requests."""
         try:
-            file_size = os.path.getsize(self.mkv_path)
-            range_header = request.headers.get("Range")
-
-            if range_header:
-                start, end = self._parse_range(range_header, file_size)
-                length = end - start + 1
-                with open(self.mkv_path, "rb") as f:
-                    f.seek(start)
-                    data = f.read(length)
-
-                resp = Response(data, mimetype="video/x-matroska", status=206)
-                resp.headers.update(
-                    {
-                        "Content-Range": f"bytes {start}-{end}/{file_size}",
-                        "Content-Length": str(length),
-                    }
-                )
-                return resp
-            else:
-                return send_file(self.mkv_path, mimetype="video/x-matroska")
+            # Werkzeug parses the Range header and streams the requested bytes
+            # in chunks, rather than buffering the whole range in memory.
+            return send_file(
+                self.mkv_path,
+                mimetype="video/x-matroska",
+                conditional=True,
+                etag=True,
+            )
 
         except FileNotFoundError:
             return Response("File not found", status=404)
         except Exception as e:
             return Response(f"An error occurred: {e}", status=500)
 
-    @staticmethod
-    def _parse_range(range_header: str, file_size: int):
-        """Parse a Range header into start and end bytes."""
-        byte_range = range_header.replace("bytes=", "").split("-")
-        start = int(byte_range[0])
-        end = int(byte_range[1]) if byte_range[1] else file_size - 1
-        if not (0 <= start <= end < file_size):
-            raise ValueError("Requested Range Not Satisfiable")
-        return start, end
-
 
 def select_file() -> str:
     """Open a Tkinter file dialog to select an MKV file."""
@@ -189,6 +210,8 @@ def main():
     port = config["server"].get("port", 8000)
     tolerance = config["timesync"].get("tolerance", 2.5)
     debug = config["server"].get("debug", False)
+    # An open-ended video stream holds a waitress thread for its whole playback
+    http_threads = config["server"].get("threads", 16)
 
     file_path = config["server"].get("file_path")
     if not file_path or not os.path.isfile(file_path):
@@ -199,17 +222,24 @@ def main():
     sync_server = SyncServer(time_tolerance=tolerance, debug=debug)
 
     def run_mkv():
-        mkv_server.app.run(debug=False, host=host, port=port, threaded=True)
+        serve(mkv_server.app, host=host, port=port, threads=http_threads)
 
     def run_sync():
         sync_server.start(host=host, port=port + 1)
 
+    if hasattr(signal, "pause"):
+        wait = signal.pause
+    else:
+        # No signal.pause() on Windows, where untimed waits ignore Ctrl+C
+        idle = threading.Event()
+        wait = functools.partial(idle.wait, 1)
+
     try:
         threading.Thread(target=run_mkv, daemon=True).start()
         threading.Thread(target=run_sync, daemon=True).start()
 
         while True:
-            threading.Event().wait(1)
+            wait()
     except KeyboardInterrupt:
         print("\n[SERVER] Shutting down...")
 